@@ -1,9 +1,17 @@
+import os
 import pickle
+import shutil
+import tempfile
+import threading
+import typedecorator
 from sys import version_info
 from unittest import TestCase, TestLoader, TextTestRunner
 
+from typedecorator import jsondecode
+from typedecorator.trace import start_recording, stop_recording, replay
 from typedecorator import (params, returns, void, setup_typecheck, Union,
-    Nullable)
+    Nullable, validate_many, register_passthrough, unregister_passthrough,
+    typecheck_scope)
 
 
 class TestTypeSignatures(TestCase):
@@ -202,6 +210,23 @@ class TestParams(TestCase):
         self.assertRaises(TypeError, lambda: params()(foo))
         self.assertRaises(TypeError, lambda: params(int)(foo))
 
+    def test_argspec(self):
+        def foo(a, b=1, *args, **kwargs):
+            c = a
+
+        def bar(a, **kw):
+            c = a
+
+        def baz(*a):
+            pass
+
+        self.assertEqual(typedecorator._argspec(foo),
+            (['a', 'b'], 'args', 'kwargs'))
+        self.assertEqual(typedecorator._argspec(bar), (['a'], None, 'kw'))
+        self.assertEqual(typedecorator._argspec(baz), ([], 'a', None))
+        self.assertEqual(typedecorator._argspec(lambda: None),
+            ([], None, None))
+
 
 class TestReturns(TestCase):
 
@@ -241,6 +266,53 @@ class TestReturns(TestCase):
         self.assertRaises(TypeError, lambda: foo('a'))
 
 
+class TestErrorMessages(TestCase):
+
+    def setUp(self):
+        setup_typecheck()
+
+    def error_message(self, fn, *args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except TypeError as e:
+            return str(e)
+        self.fail('TypeError not raised')
+
+    def test_simple_mismatch(self):
+        @params(a=int)
+        def foo(a):
+            pass
+
+        self.assertEqual(self.error_message(foo, 'x'),
+            "argument a = 'x' doesn't match signature int")
+
+    def test_nested_mismatch_location(self):
+        @params(a=[{str: (int, [int])}])
+        def foo(a):
+            pass
+
+        ok = {'items': (1, [1, 2])}
+        bad = {'items': (1, [1, 'x'])}
+        self.assertEqual(self.error_message(foo, [ok, bad]),
+            "argument a[1]['items'][1][1] = 'x' doesn't match signature int "
+            "(in [{str:(int, [int])}])")
+        self.assertEqual(self.error_message(foo, a=[ok, {1: (1, [])}]),
+            "keyword argument a[1]<key> = 1 doesn't match signature str "
+            "(in [{str:(int, [int])}])")
+        self.assertEqual(self.error_message(foo, [ok, ok, {'items': 3}]),
+            "argument a[2]['items'] = 3 doesn't match signature "
+            "(int, [int]) (in [{str:(int, [int])}])")
+
+    def test_union_mismatch_location(self):
+        @returns(set([Union(int, str)]))
+        def foo(x):
+            return x
+
+        self.assertEqual(self.error_message(foo, set([None])),
+            "return value<element> = None doesn't match signature "
+            "U(int, str) (in {U(int, str)})")
+
+
 class TestSetup(TestCase):
 
     def test_custom_exceptions(self):
@@ -270,6 +342,265 @@ class TestSetup(TestCase):
         foo()
 
 
+class TestScope(TestCase):
+
+    def setUp(self):
+        setup_typecheck()
+
+        @params(a=int)
+        def foo(a):
+            pass
+
+        self.foo = foo
+        setup_typecheck(enabled=False)
+
+    def tearDown(self):
+        setup_typecheck()
+
+    def test_scope_enables_checks(self):
+        self.foo('a')  # should not raise anything
+
+        with typecheck_scope():
+            self.assertRaises(TypeError, lambda: self.foo('a'))
+
+            with typecheck_scope(exception=None):
+                self.foo('a')  # should not raise anything
+
+            self.assertRaises(TypeError, lambda: self.foo('a'))
+
+        self.foo('a')  # should not raise anything
+
+    def test_scope_disables_checks(self):
+        setup_typecheck()
+
+        with typecheck_scope(enabled=False):
+            self.foo('a')  # should not raise anything
+
+        self.assertRaises(TypeError, lambda: self.foo('a'))
+
+    def test_scope_is_thread_local(self):
+        errors = []
+
+        def call_foo():
+            try:
+                self.foo('a')
+            except TypeError as e:
+                errors.append(e)
+
+        with typecheck_scope():
+            thread = threading.Thread(target=call_foo)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+
+class TestJSONDecode(TestCase):
+
+    def error_message(self, doc, signature, incremental=True):
+        try:
+            jsondecode.loads(doc, signature, incremental)
+        except TypeError as e:
+            return str(e)
+        self.fail('TypeError not raised')
+
+    def test_valid_documents(self):
+        sig = {str: Nullable([Union({str: [int]}, float)])}
+        doc = '{"a": [{"b": [1, 2]}, 3.5, {}], "b": null, "c": []}'
+
+        for incremental in (False, True):
+            self.assertEqual(jsondecode.loads(doc, sig, incremental),
+                {'a': [{'b': [1, 2]}, 3.5, {}], 'b': None, 'c': []})
+            self.assertEqual(jsondecode.loads(b' [1, "x"] ', list,
+                incremental), [1, 'x'])
+            self.assertEqual(jsondecode.loads('"x"', object, incremental),
+                'x')
+
+    def test_mismatch_location(self):
+        sig = {str: [{str: [int]}]}
+
+        self.assertEqual(self.error_message('[]', sig),
+            "value = [...] doesn't match signature {str:[{str:[int]}]}")
+        self.assertEqual(self.error_message('{"a": [{"b": [1, "x"]}]}', sig),
+            "value['a'][0]['b'][1] = 'x' doesn't match signature int "
+            "(in {str:[{str:[int]}]})")
+        self.assertEqual(self.error_message('{"a": [{}, 1]}', sig),
+            "value['a'][1] = 1 doesn't match signature {str:[int]} "
+            "(in {str:[{str:[int]}]})")
+        self.assertEqual(self.error_message('{"a": [{"b": {"c": 1}}]}', sig),
+            "value['a'][0]['b'] = {...} doesn't match signature [int] "
+            "(in {str:[{str:[int]}]})")
+
+    def test_decoded_before_checking(self):
+        sig = {str: [{str: [int]}]}
+
+        self.assertEqual(self.error_message('{"a": [{"b": {"c": 1}}]}', sig,
+            incremental=False),
+            "value['a'][0]['b'] = {'c': 1} doesn't match signature [int] "
+            "(in {str:[{str:[int]}]})")
+        self.assertRaises(ValueError,
+            lambda: jsondecode.loads('[{"a": [1]}, 2, {"b": ', [{str: [int]}]))
+
+    def test_stops_at_first_mismatch(self):
+        # the rest of the document isn't even valid JSON
+        self.assertRaises(TypeError,
+            lambda: jsondecode.loads('[{"a": [1]}, 2, {"b": ', [{str: [int]}],
+                incremental=True))
+
+    def test_invalid_json(self):
+        for incremental in (False, True):
+            self.assertRaises(ValueError,
+                lambda: jsondecode.loads('', object, incremental))
+            self.assertRaises(ValueError,
+                lambda: jsondecode.loads('{"a": [1]', {str: [int]},
+                    incremental))
+            self.assertRaises(ValueError,
+                lambda: jsondecode.loads('[[1]] x', [[int]], incremental))
+
+
+class TestTrace(TestCase):
+
+    def setUp(self):
+        setup_typecheck()
+        self.path = tempfile.mkdtemp()
+        self.trace = os.path.join(self.path, 'trace')
+
+    def tearDown(self):
+        stop_recording()
+        shutil.rmtree(self.path)
+        setup_typecheck()
+
+    def test_record_and_replay(self):
+        @returns(int)
+        @params(a=int, b=[int])
+        def foo(a, b):
+            return a
+
+        @returns(str)
+        def bar():
+            return 1
+
+        setup_typecheck(enabled=False)
+        start_recording(self.trace)
+        foo(1, [])
+        foo(1, b=[])
+        foo('a', [])
+        bar()
+        stop_recording()
+
+        report = replay(self.trace)
+        foo_report = [v for k, v in report.items() if k.endswith('foo')][0]
+        bar_report = [v for k, v in report.items() if k.endswith('bar')][0]
+
+        self.assertEqual(foo_report['a'][0], 'int')
+        self.assertEqual([(n, m) for _, n, m in foo_report['a'][1]],
+            [(2, True), (1, False)])
+        self.assertEqual([(n, m) for _, n, m in foo_report['b'][1]],
+            [(3, True)])
+        self.assertEqual([(n, m) for _, n, m in foo_report['return'][1]],
+            [(2, True), (1, False)])
+        self.assertEqual([(n, m) for _, n, m in bar_report['return'][1]],
+            [(1, False)])
+
+    def test_ring_buffer_keeps_latest_calls(self):
+        @params(a=Union(int, str))
+        def foo(a):
+            pass
+
+        setup_typecheck(enabled=False)
+        start_recording(self.trace, capacity=2)
+        foo(1)
+        foo('a')
+        foo('b')
+        stop_recording()
+
+        report = [v for k, v in replay(self.trace).items()
+            if k.endswith('foo')][0]
+        self.assertEqual([(n, m) for _, n, m in report['a'][1]], [(2, True)])
+
+    def test_too_many_functions(self):
+        @params(a=int)
+        def foo(a):
+            pass
+
+        @params(a=int)
+        def bar(a):
+            pass
+
+        max_id = typedecorator.trace._MAX_ID
+        typedecorator.trace._MAX_ID = 1
+        try:
+            recorder = start_recording(self.trace)
+            foo(1)
+            bar(1)
+            bar(2)
+            stop_recording()
+        finally:
+            typedecorator.trace._MAX_ID = max_id
+
+        self.assertEqual(recorder.dropped, 2)
+        self.assertEqual([k.rsplit('.', 1)[-1] for k in replay(self.trace)],
+            ['foo'])
+
+    def test_forked_process_records_separately(self):
+        if not hasattr(os, 'register_at_fork'):
+            self.skipTest('os.register_at_fork not available')
+
+        @params(a=Union(int, str))
+        def foo(a):
+            pass
+
+        start_recording(self.trace)
+        foo(1)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                foo('a')
+                stop_recording()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        foo(2)
+        stop_recording()
+
+        def observed(path):
+            report = [v for k, v in replay(path).items()
+                if k.endswith('foo')][0]
+            return [(name.rsplit('.', 1)[-1], n) for name, n, _
+                in report['a'][1]]
+
+        self.assertEqual(observed(self.trace), [('int', 2)])
+        self.assertEqual(observed('%s.%d' % (self.trace, pid)),
+            [('str', 1)])
+
+    def test_concurrent_registration(self):
+        types = [type('T%d' % i, (object,), {}) for i in range(50)]
+
+        def register(t):
+            @params(a=t)
+            def foo(a):
+                pass
+
+            foo(t())
+
+        start_recording(self.trace)
+        threads = [threading.Thread(target=register, args=(t,))
+            for t in types]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop_recording()
+
+        # all the functions have the same name, so they're reported together
+        report = [v for k, v in replay(self.trace).items()
+            if k.endswith('register.<locals>.foo')][0]
+        observed = sorted((name.rsplit('.', 1)[-1], n, m)
+            for name, n, m in report['a'][1])
+        self.assertEqual(observed,
+            sorted(('T%d' % i, 1, True) for i in range(50)))
+
+
 class TestMethodAnnotation(TestCase):
 
     def setUp(self):
@@ -316,6 +647,125 @@ class TestMethodAnnotation(TestCase):
         self.assertRaises(TypeError, lambda: a + 1)
 
 
+class TestSignatureInterning(TestCase):
+
+    def test_equal_signatures_are_shared(self):
+        a = typedecorator._intern({str: [Union(int, 'Foo')]})
+        b = typedecorator._intern({str: [Union(int, 'Foo')]})
+
+        self.assertTrue(a is b)
+        self.assertTrue(a.string is b.string)
+
+    def test_different_signatures_are_distinct(self):
+        intern = typedecorator._intern
+
+        self.assertFalse(intern([int]) is intern((int,)))
+        self.assertFalse(intern(int) is intern('int'))
+        self.assertFalse(intern((int, str)) is intern(Union(int, str)))
+
+
+class TestPassthrough(TestCase):
+
+    def setUp(self):
+        setup_typecheck()
+
+    def test_registered_types_pass_any_check(self):
+        class Anything(object):
+            pass
+
+        @params(a={str: [int]})
+        def foo(a):
+            pass
+
+        self.assertRaises(TypeError, lambda: foo(Anything()))
+        self.assertRaises(TypeError, lambda: foo({'a': [Anything()]}))
+
+        register_passthrough(Anything)
+        try:
+            # should not raise anything
+            foo(Anything())
+            foo({'a': [1, Anything()]})
+        finally:
+            unregister_passthrough(Anything)
+
+        self.assertRaises(TypeError, lambda: foo(Anything()))
+
+    def test_no_overhead_when_empty(self):
+        check = typedecorator._intern(int).check
+        self.assertEqual(check.__name__, 'check')
+
+
+class PassthroughTestType(object):
+    """Used for TestValidateMany.test_process_pool_passthrough"""
+
+
+class TestValidateMany(TestCase):
+
+    def test_all_valid(self):
+        self.assertEqual(validate_many([1, 2, 3], int), [])
+        self.assertEqual(validate_many([], int), [])
+
+    def test_failures_report_indexes_and_reasons(self):
+        failures = validate_many([(1, 'a'), (2, 2), (3, 'c'), None],
+            (int, str))
+
+        self.assertEqual([i for i, _ in failures], [1, 3])
+        self.assertTrue('(int, str)' in failures[0][1])
+
+    def test_streaming_input(self):
+        values = (i if i % 7 else str(i) for i in range(1, 100))
+        failures = validate_many(values, int, chunk_size=10)
+
+        self.assertEqual([i for i, _ in failures], list(range(6, 99, 7)))
+
+    def test_process_pool(self):
+        try:
+            import concurrent.futures
+        except ImportError:
+            self.skipTest('concurrent.futures not available')
+
+        values = [i if i % 7 else str(i) for i in range(1, 100)]
+        failures = validate_many(values, Union(int, float), chunk_size=10,
+            workers=2)
+
+        self.assertEqual([i for i, _ in failures], list(range(6, 99, 7)))
+
+    def test_process_pool_passthrough(self):
+        if version_info < (3, 7):
+            self.skipTest('mp_context requires Python 3.7')
+        import multiprocessing
+
+        # workers started with spawn don't inherit the parent's registry
+        register_passthrough(PassthroughTestType)
+        try:
+            values = [1, PassthroughTestType(), 'a'] * 10
+            failures = validate_many(values, int, chunk_size=5, workers=2,
+                mp_context=multiprocessing.get_context('spawn'))
+        finally:
+            unregister_passthrough(PassthroughTestType)
+
+        self.assertEqual([i for i, _ in failures], list(range(2, 30, 3)))
+
+    def test_single_chunk_is_checked_in_process(self):
+        # functions can't be pickled, so this only works without the pool
+        values = [lambda: None] * 10
+        self.assertEqual(validate_many(values, object, chunk_size=10,
+            workers=2), [])
+        self.assertEqual(len(validate_many(values, int, chunk_size=10,
+            workers=2)), 10)
+
+    def test_checks_regardless_of_setup(self):
+        setup_typecheck(enabled=False)
+        try:
+            self.assertEqual(len(validate_many(['a'], int)), 1)
+        finally:
+            setup_typecheck()
+
+    def test_invalid_arguments(self):
+        self.assertRaises(TypeError, lambda: validate_many([], None))
+        self.assertRaises(ValueError, lambda: validate_many([], int, 0))
+
+
 @returns(int)
 @params(a=int, b=int)
 def pickle_test_function(a, b):
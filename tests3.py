@@ -1,7 +1,16 @@
 # Tests using Python3-specific syntax
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import typedecorator
 from unittest import TestCase, main
+from unittest.mock import Mock, MagicMock
 
-from typedecorator import typed, setup_typecheck
+from typedecorator import (typed, setup_typecheck, register_mock,
+    unregister_passthrough, typecheck_scope)
+from typedecorator.importhook import install_import_hook, uninstall_import_hook
 
 
 class TestPython3Annotations(TestCase):
@@ -31,6 +40,368 @@ class TestPython3Annotations(TestCase):
         with self.assertRaises(TypeError):
             bar('x')
 
+    def test_argspec_keyword_only_arguments(self):
+        def foo(a, *args, b, c=1, **kwargs):
+            d = a
+
+        def bar(a, *, b):
+            pass
+
+        self.assertEqual(typedecorator._argspec(foo),
+            (['a'], 'args', 'kwargs'))
+        self.assertEqual(typedecorator._argspec(bar), (['a'], None, None))
+
+    def test_typed_none_return(self):
+
+        @typed
+        def foo(a: int) -> None:
+            if a:
+                return a
+
+        @typed
+        class Point(object):
+            def __init__(self, x: int) -> None:
+                self.x = x
+
+        # should not raise exception
+        foo(0)
+        Point(1)
+
+        with self.assertRaises(TypeError):
+            foo('a')
+        with self.assertRaises(TypeError):
+            foo(1)
+        with self.assertRaises(TypeError):
+            Point('a')
+
+
+class TestTypedClass(TestCase):
+    def setUp(self):
+        setup_typecheck()
+
+    def test_typed_class(self):
+
+        @typed
+        class Accumulator(object):
+            sum = 0
+
+            def add(self, a: int) -> None:
+                self.sum = self.sum + a
+
+            def untyped(self, a):
+                return a
+
+            @classmethod
+            def add2(cls, a: int, b: int) -> int:
+                return a + b
+
+            @staticmethod
+            def add3(a: int, b: int, c: int) -> int:
+                return a + b + c
+
+            @property
+            def total(self) -> int:
+                return self.sum
+
+            @total.setter
+            def total(self, value: int):
+                self.sum = value
+
+            def __add__(self, other: 'Accumulator') -> 'Accumulator':
+                acc = Accumulator()
+                acc.sum = self.sum + other.sum
+                return acc
+
+        a = Accumulator()
+
+        # should not raise exception
+        Accumulator.add2(1, 2)
+        Accumulator.add3(1, 2, 3)
+        a.add(1)
+        a.untyped('x')
+        self.assertEqual(a.total, 1)
+        a.total = 2
+        c = a + Accumulator()
+
+        with self.assertRaises(TypeError):
+            Accumulator.add2(1, 'a')
+        with self.assertRaises(TypeError):
+            a.add3(1, 2, None)
+        with self.assertRaises(TypeError):
+            a.add(None)
+        with self.assertRaises(TypeError):
+            a.total = 'x'
+        with self.assertRaises(TypeError):
+            a + 1
+
+    def test_typed_subclass(self):
+
+        @typed
+        class Base(object):
+            def foo(self, a: int) -> int:
+                return a
+
+        @typed
+        class Derived(Base):
+            def bar(self, a: str) -> str:
+                return a
+
+        d = Derived()
+
+        # should not raise exception
+        d.foo(1)
+        d.bar('x')
+
+        with self.assertRaises(TypeError):
+            d.foo('x')
+        with self.assertRaises(TypeError):
+            d.bar(1)
+
+    def test_typed_new(self):
+
+        @typed
+        class Wrapper(object):
+            def __new__(cls, x: int):
+                instance = super(Wrapper, cls).__new__(cls)
+                instance.x = x
+                return instance
+
+        # should not raise exception
+        self.assertEqual(Wrapper(1).x, 1)
+
+        with self.assertRaises(TypeError):
+            Wrapper('x')
+
+    def test_typed_named_tuple(self):
+        from typing import NamedTuple
+
+        @typed
+        class Point(NamedTuple):
+            x: int
+            y: int = 0
+
+        # should not raise exception
+        self.assertEqual(Point(1, 2), (1, 2))
+        self.assertEqual(Point(1).y, 0)
+
+        with self.assertRaises(TypeError):
+            Point('x')
+
+    def test_annotated_self(self):
+
+        @typed
+        class B(object):
+            def m(self: 'B', x: int) -> int:
+                return x
+
+        # should not raise exception
+        B().m(1)
+
+        with self.assertRaises(TypeError):
+            B().m('x')
+
+
+HOOKED_MODULE = """
+from typing import Optional
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+def void(a: int) -> None:
+    pass
+
+def optional(a: int, b: Optional[int]) -> int:
+    return a
+
+def quoted(a: 'int') -> 'Accumulator':
+    return Accumulator(a)
+
+def partial(a: int, b):
+    return a
+
+def untyped(a):
+    return a
+
+class Accumulator(object):
+    def __init__(self, sum: int = 0) -> None:
+        self.sum = sum
+
+    def add(self, a: int) -> None:
+        self.sum = self.sum + a
+"""
+
+# `Missing` isn't defined in the module, so it can't be resolved even when
+# the annotations are postponed
+MISSING_ANNOTATION = """
+def missing(a: %s, b: int) -> int:
+    return b
+"""
+
+
+class Missing(object):
+    pass
+
+
+class TestImportHook(TestCase):
+    def setUp(self):
+        setup_typecheck()
+        self.path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.path, 'hookedpkg'))
+        open(os.path.join(self.path, 'hookedpkg', '__init__.py'), 'w').close()
+        modules = {
+            os.path.join('hookedpkg', 'checked.py'):
+                HOOKED_MODULE + MISSING_ANNOTATION % "'Missing'",
+            os.path.join('hookedpkg', 'postponed.py'):
+                'from __future__ import annotations\n' + HOOKED_MODULE +
+                MISSING_ANNOTATION % 'Missing',
+            'unchecked.py': HOOKED_MODULE,
+        }
+        for name, source in modules.items():
+            with open(os.path.join(self.path, name), 'w') as f:
+                f.write(source)
+        sys.path.insert(0, self.path)
+
+    def tearDown(self):
+        uninstall_import_hook()
+        sys.path.remove(self.path)
+        for name in ('hookedpkg', 'hookedpkg.checked', 'hookedpkg.postponed',
+                'unchecked'):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.path)
+
+    def check_hooked_module(self, module):
+        # should not raise exception
+        self.assertEqual(module.add(1, 2), 3)
+        module.void(1)
+        module.quoted(1)
+        module.untyped('a')
+        module.missing(Missing(), 1)
+        module.Accumulator().add(1)
+
+        # left unchecked, but logged
+        with self.assertLogs('typedecorator', 'WARNING') as logs:
+            module.optional(1, None)
+            module.partial('a', 'b')
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('optional not type checked', logs.output[0])
+        self.assertIn('partial not type checked', logs.output[1])
+
+        with self.assertRaises(TypeError):
+            module.add('a', 'b')
+        with self.assertRaises(TypeError):
+            module.void('a')
+        with self.assertRaises(TypeError):
+            module.quoted('a')
+        with self.assertRaises(TypeError):
+            module.missing(Missing(), 'a')
+        with self.assertRaises(TypeError):
+            module.Accumulator('a')
+        with self.assertRaises(TypeError):
+            module.Accumulator().add('a')
+
+    def test_import_hook(self):
+        install_import_hook('hookedpkg')
+
+        from hookedpkg import checked
+        import unchecked
+
+        self.check_hooked_module(checked)
+        unchecked.add('a', 'b')  # should not raise exception
+
+    def test_postponed_annotations(self):
+        install_import_hook('hookedpkg')
+
+        from hookedpkg import postponed
+
+        self.check_hooked_module(postponed)
+
+    def test_prefixes_from_environment(self):
+        os.environ['TYPEDECORATOR_IMPORT_HOOK'] = 'foo, hookedpkg'
+        try:
+            install_import_hook()
+        finally:
+            del os.environ['TYPEDECORATOR_IMPORT_HOOK']
+
+        from hookedpkg import checked
+
+        with self.assertRaises(TypeError):
+            checked.add('a', 'b')
+
+    def test_no_prefixes(self):
+        install_import_hook()
+
+        from hookedpkg import checked
+
+        # should not raise exception
+        checked.add('a', 'b')
+
+
+class TestAsyncScope(TestCase):
+    def setUp(self):
+        setup_typecheck()
+
+    def tearDown(self):
+        setup_typecheck()
+
+    def test_scope_is_task_local(self):
+
+        @typed
+        def foo(a: int):
+            pass
+
+        setup_typecheck(enabled=False)
+
+        async def checked():
+            with typecheck_scope():
+                await asyncio.sleep(0.01)
+                with self.assertRaises(TypeError):
+                    foo('a')
+
+        async def unchecked():
+            await asyncio.sleep(0)
+            foo('a')  # should not raise exception
+
+        async def run():
+            await asyncio.gather(checked(), unchecked())
+
+        asyncio.run(run())
+
+    def test_scope_exited_in_another_context(self):
+        import contextvars
+        import typedecorator
+
+        scope = typecheck_scope()
+        contextvars.copy_context().run(scope.__enter__)
+        with self.assertRaises(ValueError):
+            contextvars.Context().run(scope.__exit__, None, None, None)
+
+        self.assertEqual(typedecorator._open_scopes, 0)
+
+
+class TestMocking(TestCase):
+    def setUp(self):
+        setup_typecheck()
+
+    def test_register_mock(self):
+
+        @typed
+        def foo(a: [int]) -> int:
+            return 0
+
+        with self.assertRaises(TypeError):
+            foo(Mock())
+
+        register_mock()
+        try:
+            # should not raise exception
+            foo(Mock())
+            foo([MagicMock()])
+        finally:
+            unregister_passthrough(Mock)
+
+        with self.assertRaises(TypeError):
+            foo(Mock())
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# Copyright (C) 2014. Senko Rasic <senko.rasic@goodcode.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Import hook applying @typed to whole packages.
+
+Once installed, the hook wraps all the annotated functions and methods
+defined in the matching modules as if they were decorated with `@typed`.
+This is useful for enabling type checks across a whole code base (for
+example, in a staging environment) without decorating every function by
+hand.
+
+Example:
+
+    from typedecorator import setup_typecheck
+    from typedecorator.importhook import install_import_hook
+
+    setup_typecheck()
+    install_import_hook('myapp', 'mylib.models')
+
+    import myapp.views  # annotated functions in myapp.views are now checked
+
+To keep the import cost low, the type signatures are only compiled when
+each function is first called. In modules using `from __future__ import
+annotations`, the annotations are resolved with `typing.get_type_hints`;
+if that fails, or elsewhere, string annotations are checked against the
+class names, as with `@params`. Functions whose annotations aren't valid
+type signatures (eg. `Optional[int]`), or that have some of their arguments
+unannotated, are left unchecked, and a warning is logged when they're first
+called.
+
+The hook only affects modules imported after it has been installed, and it
+can't wrap references to the functions taken while the module was still
+being executed (eg. by registration decorators).
+
+If no package prefixes are given, they are read from the comma-separated
+`TYPEDECORATOR_IMPORT_HOOK` environment variable. If it's empty or unset,
+the hook isn't installed, so the checks can be turned off in production
+without changing the code.
+
+"""
+
+import __future__
+import importlib.abc
+import inspect
+import os
+import sys
+import typing
+
+from . import _logger, _typed_class, _typed_function
+
+__all__ = ['install_import_hook', 'uninstall_import_hook']
+
+_annotations_feature = getattr(__future__, 'annotations', None)
+
+
+def _annotations(fn):
+    """Return the function's annotations, resolving postponed ones."""
+    if _annotations_feature is not None and (fn.__code__.co_flags &
+            _annotations_feature.compiler_flag):
+        try:
+            return typing.get_type_hints(fn)
+        except Exception:
+            pass
+    return fn.__annotations__
+
+
+def _lazy_typed(fn, method=True):
+    """Wrap function with @typed checks, compiled on the first call."""
+
+    if not getattr(fn, '__annotations__', None):
+        return fn
+
+    def compile_and_call(*args, **kwargs):
+        try:
+            checked = _typed_function(fn, method, _annotations(fn))
+        except TypeError as e:
+            _logger.warning("%s.%s not type checked: %s" % (fn.__module__,
+                getattr(fn, '__qualname__', fn.__name__), e))
+            checked = fn
+        target[0] = checked
+        return checked(*args, **kwargs)
+
+    target = [compile_and_call]
+
+    def wrapper(*args, **kwargs):
+        return target[0](*args, **kwargs)
+
+    wrapper.__name__ = fn.__name__
+    wrapper.__doc__ = fn.__doc__
+    wrapper.__module__ = fn.__module__
+    return wrapper
+
+
+def _wrap_module(module):
+    for name, attr in list(vars(module).items()):
+        if getattr(attr, '__module__', None) != module.__name__:
+            continue
+        if inspect.isfunction(attr):
+            setattr(module, name, _lazy_typed(attr, False))
+        elif inspect.isclass(attr):
+            _typed_class(attr, _lazy_typed)
+
+
+class _TypedLoader(importlib.abc.Loader):
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.loader.exec_module(module)
+        _wrap_module(module)
+
+
+class _TypedFinder(importlib.abc.MetaPathFinder):
+
+    def __init__(self, prefixes):
+        self.prefixes = tuple(prefixes)
+
+    def _matches(self, fullname):
+        return any(fullname == prefix or fullname.startswith(prefix + '.')
+            for prefix in self.prefixes)
+
+    def find_spec(self, fullname, path, target=None):
+        if not self._matches(fullname):
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TypedLoader(spec.loader)
+        return spec
+
+
+_finder = None
+
+
+def install_import_hook(*prefixes):
+    """
+    Apply @typed to modules in the given packages when they're imported
+
+    :param str prefixes:
+        Names of the packages or modules to check (their submodules are
+        included). If none are given, they're read from the comma-separated
+        `TYPEDECORATOR_IMPORT_HOOK` environment variable.
+
+    Installing the hook again replaces the previous package prefixes.
+
+    """
+    global _finder
+
+    if not prefixes:
+        prefixes = [p.strip() for p in
+            os.environ.get('TYPEDECORATOR_IMPORT_HOOK', '').split(',')
+            if p.strip()]
+
+    uninstall_import_hook()
+    if prefixes:
+        _finder = _TypedFinder(prefixes)
+        sys.meta_path.insert(0, _finder)
+
+
+def uninstall_import_hook():
+    """Stop applying @typed to newly imported modules"""
+    global _finder
+
+    if _finder is not None:
+        sys.meta_path.remove(_finder)
+        _finder = None
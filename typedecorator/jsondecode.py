@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# Copyright (C) 2014. Senko Rasic <senko.rasic@goodcode.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Validation of JSON documents while decoding them.
+
+`loads` and `load` decode a JSON document and check the result against a
+type signature:
+
+    from typedecorator.jsondecode import loads
+
+    data = loads(request.body, {str: [int]})
+
+The result is the same as that of `json.loads`, and a `TypeError` is raised
+if it doesn't match the signature.
+
+With `incremental=True`, the values are instead checked as they are decoded,
+stopping at the first one not matching the signature. The outer containers
+are then decoded element by element, and a value of the wrong kind (eg. an
+object where a list is expected) is rejected without decoding it. The
+innermost containers are decoded as a whole by `json`'s scanner and then
+checked. Since decoding in Python is slower than the scanner, a valid
+document takes about twice as long to decode as with `json.loads` followed
+by a check; the gain is in rejecting large invalid documents early.
+
+"""
+
+import json
+import json.decoder
+
+from typedecorator import _intern, _state, Union, range_type, string_type
+
+__all__ = ['loads', 'load']
+
+try:
+    from json import JSONDecodeError
+except ImportError:
+    JSONDecodeError = None
+
+_decoder = json.JSONDecoder()
+_scan_once = _decoder.scan_once
+_skip = json.decoder.WHITESPACE.match
+_whitespace = ' \t\n\r'
+_scanstring = json.decoder.scanstring
+
+# Type of the value starting with each character, None for numbers
+_kinds = {'{': dict, '[': list, '"': type(u''), 't': bool, 'f': bool,
+    'n': type(None)}
+_placeholders = {dict: '{...}', list: '[...]'}
+_decoders = {}  # _Signature -> compiled decoding function
+
+
+class _Mismatch(Exception):
+    """Raised by the decoding functions when a value doesn't match"""
+
+    def __init__(self, sig, value, path):
+        self.sig = sig
+        self.value = value
+        self.path = path  # in reverse, see `typedecorator._compile`
+
+
+def _syntax_error(msg, s, idx):
+    if JSONDecodeError is not None:
+        raise JSONDecodeError(msg, s, idx)
+    raise ValueError('%s: char %d' % (msg, idx))
+
+
+def _scan(s, idx):
+    """Decode the JSON value at s[idx:] using `json`'s scanner"""
+    try:
+        return _scan_once(s, idx)
+    except StopIteration as e:
+        _syntax_error('Expecting value', s, e.args[0])
+
+
+def _could_match(t, kind):
+    """Whether a value of the kind could match the type signature"""
+    if isinstance(t, list):
+        return kind is list
+    elif isinstance(t, dict):
+        return kind is dict
+    elif isinstance(t, (tuple, set)):
+        return False  # JSON arrays are decoded as lists
+    elif isinstance(t, Union):
+        return any(_could_match(x, kind) for x in t)
+    elif kind is None:
+        return True  # numbers are only known after they're decoded
+    elif t is range_type:
+        return kind in (dict, list) or issubclass(kind, string_type)
+    elif isinstance(t, type):
+        return issubclass(kind, t)
+    else:
+        return t in [base.__name__ for base in kind.mro()]
+
+
+def _has_containers(t):
+    if isinstance(t, (list, dict)):
+        return True
+    elif isinstance(t, Union):
+        return any(_has_containers(x) for x in t)
+    return False
+
+
+def _decoder_for(sig):
+    decode = _decoders.get(sig)
+    if decode is None:
+        decode = _decoders.setdefault(sig, _compile_decoder(sig))
+    return decode
+
+
+def _compile_decoder(sig):
+    """Build a function decoding a JSON value and checking it against `sig`.
+
+    The function takes the document and the index at which the value starts,
+    and returns the decoded value and the index at which it ends. Before
+    decoding the value, the function checks whether a value starting with
+    that character could match the signature at all.
+
+    Decoding in Python is much slower than `json`'s C scanner, so only the
+    containers whose elements are containers themselves are decoded
+    element by element. The innermost containers (and all other values) are
+    decoded by the scanner as a whole and then checked.
+    """
+    t = sig.signature
+    kinds = [dict, list, type(u''), bool, type(None), None]
+    allowed = frozenset(k for k in kinds if _could_match(t, k))
+    check = sig.check
+
+    def reject(s, idx, kind):
+        if kind in _placeholders:
+            raise _Mismatch(sig, _placeholders[kind], [])
+        value, _ = _scan(s, idx)
+        raise _Mismatch(sig, repr(value), [])
+
+    if isinstance(t, list) and _has_containers(t[0]):
+        item = _decoder_for(_intern(t[0]))
+
+        def decode(s, idx):
+            if s[idx:idx + 1] != '[':
+                reject(s, idx, _kinds.get(s[idx:idx + 1]))
+            return _decode_array(s, idx, item)
+    elif isinstance(t, dict) and (_has_containers(list(t)[0]) or
+            _has_containers(list(t.values())[0])):
+        tk, tv = list(t.items())[0]
+        key, value = _intern(tk), _decoder_for(_intern(tv))
+
+        def decode(s, idx):
+            if s[idx:idx + 1] != '{':
+                reject(s, idx, _kinds.get(s[idx:idx + 1]))
+            return _decode_object(s, idx, key, value)
+    elif isinstance(t, Union) and _has_containers(t):
+        # Values of each kind are decoded with the only alternative that
+        # could match them, if there is one.
+        dispatch = {}
+        for kind in allowed:
+            alternatives = [x for x in t if _could_match(x, kind)]
+            if len(alternatives) == 1:
+                dispatch[kind] = _decoder_for(_intern(alternatives[0]))
+
+        def decode_whole(s, idx):
+            value, end = _scan(s, idx)
+            if not check(value):
+                record = _state.mismatch
+                raise _Mismatch(record[0], repr(record[1]), record[2:])
+            return value, end
+
+        def decode(s, idx):
+            kind = _kinds.get(s[idx:idx + 1])
+            if kind not in allowed:
+                reject(s, idx, kind)
+            return dispatch.get(kind, decode_whole)(s, idx)
+    else:
+        def decode(s, idx):
+            kind = _kinds.get(s[idx:idx + 1])
+            if kind not in allowed:
+                reject(s, idx, kind)
+            value, end = _scan(s, idx)
+            if not check(value):
+                record = _state.mismatch
+                raise _Mismatch(record[0], repr(record[1]), record[2:])
+            return value, end
+
+    return decode
+
+
+def _decode_array(s, idx, item):
+    values = []
+    append = values.append
+    idx = _skip(s, idx + 1).end()
+    if s[idx:idx + 1] == ']':
+        return values, idx + 1
+
+    while True:
+        try:
+            value, idx = item(s, idx)
+        except _Mismatch as e:
+            e.path.append('[%d]' % len(values))
+            raise
+        append(value)
+
+        c = s[idx:idx + 1]
+        if c and c in _whitespace:
+            idx = _skip(s, idx).end()
+            c = s[idx:idx + 1]
+        if c == ']':
+            return values, idx + 1
+        elif c != ',':
+            _syntax_error("Expecting ',' delimiter", s, idx)
+        idx += 1
+        if s[idx:idx + 1] in _whitespace:
+            idx = _skip(s, idx).end()
+
+
+def _decode_object(s, idx, key, value):
+    pairs = {}
+    idx = _skip(s, idx + 1).end()
+    if s[idx:idx + 1] == '}':
+        return pairs, idx + 1
+
+    while True:
+        if s[idx:idx + 1] != '"':
+            _syntax_error('Expecting property name enclosed in double quotes',
+                s, idx)
+        k, idx = _scanstring(s, idx + 1)
+        if not key.check(k):
+            raise _Mismatch(key, repr(k), ['<key>'])
+
+        if s[idx:idx + 1] != ':':
+            idx = _skip(s, idx).end()
+            if s[idx:idx + 1] != ':':
+                _syntax_error("Expecting ':' delimiter", s, idx)
+        idx += 1
+        if s[idx:idx + 1] in _whitespace:
+            idx = _skip(s, idx).end()
+
+        try:
+            pairs[k], idx = value(s, idx)
+        except _Mismatch as e:
+            e.path.append('[%r]' % (k,))
+            raise
+
+        c = s[idx:idx + 1]
+        if c and c in _whitespace:
+            idx = _skip(s, idx).end()
+            c = s[idx:idx + 1]
+        if c == '}':
+            return pairs, idx + 1
+        elif c != ',':
+            _syntax_error("Expecting ',' delimiter", s, idx)
+        idx += 1
+        if s[idx:idx + 1] in _whitespace:
+            idx = _skip(s, idx).end()
+
+
+def _mismatch_error(sig, e):
+    location = ''.join(reversed(e.path))
+    if not location:
+        return TypeError("value = %s doesn't match signature %s" % (
+            e.value, sig.string))
+    return TypeError("value%s = %s doesn't match signature %s (in %s)" % (
+        location, e.value, e.sig.string, sig.string))
+
+
+def loads(s, signature, incremental=False):
+    """
+    Decode a JSON document, checking that it matches the type signature
+
+    :param s:
+        The JSON document (`str`, or UTF-8 encoded `bytes`).
+    :param signature:
+        The type signature the decoded value must match.
+    :param bool incremental:
+        Check the values while decoding them, stopping at the first one
+        found not to match (default: False). This is slower for valid
+        documents, see the module documentation.
+
+    Raises `TypeError` if the decoded value doesn't match the signature, and
+    `ValueError` if the document isn't valid JSON.
+
+    """
+    sig = _intern(signature)
+    if isinstance(s, bytes) and not isinstance(s, string_type):
+        s = s.decode('utf-8')
+
+    if not incremental:
+        value = json.loads(s)
+        if not sig.check(value):
+            record = _state.mismatch
+            raise _mismatch_error(sig,
+                _Mismatch(record[0], repr(record[1]), record[2:]))
+        return value
+
+    idx = _skip(s, 0).end()
+    try:
+        value, idx = _decoder_for(sig)(s, idx)
+    except _Mismatch as e:
+        raise _mismatch_error(sig, e)
+
+    idx = _skip(s, idx).end()
+    if idx != len(s):
+        _syntax_error('Extra data', s, idx)
+    return value
+
+
+def load(fp, signature, incremental=False):
+    """
+    Decode a JSON document read from a file, see `loads`
+
+    The whole file is read into memory before decoding it.
+
+    """
+    return loads(fp.read(), signature, incremental)
@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+# Copyright (C) 2014. Senko Rasic <senko.rasic@goodcode.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Recording of runtime types for offline verification.
+
+Instead of checking the type signatures on every call, the decorated
+functions can record the concrete types of their arguments and return
+values into a trace file. The trace can later be verified against the
+declared signatures, reporting the violations and the types that were
+actually observed.
+
+Example:
+
+    from typedecorator.trace import start_recording
+
+    start_recording('/var/tmp/myapp.trace')
+
+and later, offline:
+
+    python -m typedecorator.trace /var/tmp/myapp.trace
+
+Each call is stored as a fixed-size record (the function id and up to
+`MAX_ARGS` argument type ids, followed by the return value type id) in a
+memory-mapped ring buffer, so the trace file has a bounded size and only
+the most recent calls are kept. The names of the functions and types,
+and the declared signatures, are written to a JSON file alongside the trace
+(`<path>.json`) when the recording is flushed or stopped.
+
+Only the types of the values themselves are recorded, not the types of their
+elements, so the offline verification can only check the outermost part of
+container signatures (eg. that a value declared as `[int]` is a list).
+
+At most 65535 distinct functions and types can be recorded in one trace.
+Calls of functions beyond that are not recorded (their number is stored in
+the metadata file), and arguments of types beyond that are recorded as
+unknown; a warning is logged when that happens.
+
+Every process should record into its own trace file. Where supported (on
+Unix with Python 3.7 or later), a child process forked while recording
+switches to recording into `<path>.<pid>`.
+
+"""
+
+import atexit
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+import typedecorator
+from typedecorator import Union, range_type, string_type
+
+__all__ = ['TraceRecorder', 'start_recording', 'stop_recording', 'replay']
+
+MAX_ARGS = 14  # argument types recorded per call, the rest are ignored
+
+_MAGIC = b'TDTRACE1'
+_HEADER = struct.Struct('<8sQQ')  # magic, calls recorded, capacity
+_HEADER_SIZE = 32
+_RECORD = struct.Struct('<%dH' % (MAX_ARGS + 2))  # function, args, retval
+_MAX_ID = 0xffff  # largest function or type id; 0 means unknown
+
+
+def _type_name(t):
+    return '%s.%s' % (t.__module__, getattr(t, '__qualname__', t.__name__))
+
+
+def _encode_signature(t):
+    """Convert type signature to a JSON-serializable form"""
+    if t is None:
+        return None
+    elif t is range_type:
+        return ['iterable']
+    elif isinstance(t, type):
+        return ['type', _type_name(t)]
+    elif isinstance(t, string_type):
+        return ['name', t]
+    elif isinstance(t, list):
+        return ['list', _encode_signature(t[0])]
+    elif isinstance(t, tuple):
+        return ['tuple'] + [_encode_signature(x) for x in t]
+    elif isinstance(t, dict):
+        k, v = list(t.items())[0]
+        return ['dict', _encode_signature(k), _encode_signature(v)]
+    elif isinstance(t, set):
+        return ['set', _encode_signature(list(t)[0])]
+    elif isinstance(t, Union):
+        return ['union'] + [_encode_signature(x) for x in t]
+
+
+class TraceRecorder(object):
+    """
+    Record the types of arguments and return values into a trace file
+
+    :param str path:
+        Trace file path. An existing file is overwritten.
+    :param int capacity:
+        Maximum number of calls to keep in the trace (default: 65536). Each
+        call takes 32 bytes; once the trace is full, the oldest calls are
+        overwritten.
+
+    """
+
+    def __init__(self, path, capacity=65536):
+        self.path = path
+        self.capacity = capacity
+        self._calls = 0
+        self._lock = threading.Lock()
+        self._function_ids = {}
+        self._functions = []
+        self._type_ids = {}
+        self._types = []
+        self._overflowed = False
+        self.dropped = 0  # calls not recorded because of too many functions
+
+        with open(path, 'wb') as f:
+            f.truncate(_HEADER_SIZE + capacity * _RECORD.size)
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        _HEADER.pack_into(self._map, 0, _MAGIC, 0, capacity)
+
+    def _id(self, ids, items, key):
+        """Assign the function or type an id, or 0 if out of ids"""
+        item_id = ids.get(key)
+        if item_id is None:
+            with self._lock:
+                item_id = ids.get(key)
+                if item_id is None:
+                    if len(items) < _MAX_ID:
+                        items.append(key)
+                        item_id = len(items)
+                    else:
+                        item_id = 0
+                        if not self._overflowed:
+                            self._overflowed = True
+                            typedecorator._logger.warning(
+                                "%s: more than %d functions or types traced, "
+                                "the rest are not recorded" %
+                                (self.path, _MAX_ID))
+                    ids[key] = item_id
+        return item_id
+
+    def _type_id(self, t):
+        return self._id(self._type_ids, self._types, t)
+
+    def record(self, trace, args, kwargs, retval):
+        """Record a call of the function with the given trace metadata"""
+        function_id = self._id(self._function_ids, self._functions, trace)
+        if not function_id:
+            with self._lock:
+                self.dropped += 1
+            return
+
+        type_id = self._type_id
+        ids = [0] * (MAX_ARGS + 2)
+        ids[0] = function_id
+        for i, arg in enumerate(args[:MAX_ARGS], 1):
+            ids[i] = type_id(type(arg))
+        if kwargs:
+            for i, name in enumerate(trace.arg_names[:MAX_ARGS], 1):
+                if name in kwargs:
+                    ids[i] = type_id(type(kwargs[name]))
+        ids[-1] = type_id(type(retval))
+
+        # The header is updated under the lock, so that the call count
+        # recorded in it never goes backwards.
+        with self._lock:
+            n = self._calls
+            self._calls = n + 1
+            struct.pack_into('<Q', self._map, 8, n + 1)
+        _RECORD.pack_into(self._map, _HEADER_SIZE +
+            (n % self.capacity) * _RECORD.size, *ids)
+
+    def flush(self):
+        """Write the trace to disk, together with the metadata file"""
+        self._map.flush()
+
+        functions = [{
+            'name': trace.name,
+            'args': trace.arg_names[:MAX_ARGS],
+            'params': [_encode_signature(trace.param_types.get(arg))
+                for arg in trace.arg_names[:MAX_ARGS]],
+            'returns': _encode_signature(trace.return_type),
+        } for trace in list(self._functions)]
+
+        types = [{
+            'name': _type_name(t),
+            'mro': [_type_name(base) for base in t.mro()],
+            'iterable': callable(getattr(t, '__iter__', None)),
+        } for t in list(self._types)]
+
+        with open(self.path + '.json', 'w') as f:
+            json.dump({'functions': functions, 'types': types,
+                'dropped': self.dropped}, f)
+
+    def close(self):
+        """Flush the trace and close the trace file"""
+        self.flush()
+        self._map.close()
+        self._file.close()
+
+
+def start_recording(path, capacity=65536):
+    """
+    Start recording the calls of all decorated functions into a trace file
+
+    The arguments are the same as for `TraceRecorder`. Recording works
+    independently of the type checks, which can stay disabled. The trace is
+    flushed when the recording is stopped, or when the program exits.
+
+    """
+    stop_recording()
+    recorder = TraceRecorder(path, capacity)
+    typedecorator._set_recorder(recorder)
+    return recorder
+
+
+def stop_recording():
+    """Stop recording, flushing and closing the trace file"""
+    recorder = typedecorator._recorder
+    if recorder is not None:
+        typedecorator._set_recorder(None)
+        recorder.close()
+
+
+atexit.register(stop_recording)
+
+
+def _after_fork_in_child():
+    recorder = typedecorator._recorder
+    if recorder is None:
+        return
+
+    # The trace file is mapped shared with the parent, which keeps writing
+    # into it, so the child records into its own file. The parent's file
+    # is closed without flushing the child's copy of the metadata over it.
+    recorder._map.close()
+    recorder._file.close()
+    try:
+        typedecorator._recorder = TraceRecorder(
+            '%s.%d' % (recorder.path, os.getpid()), recorder.capacity)
+    except (IOError, OSError) as e:
+        typedecorator._logger.warning("can't record in forked process: %s" %
+            e)
+        typedecorator._set_recorder(None)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _read(path):
+    with open(path + '.json') as f:
+        meta = json.load(f)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, calls, capacity = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError('%s is not a type trace file' % path)
+
+    records = [_RECORD.unpack_from(data, _HEADER_SIZE + i * _RECORD.size)
+        for i in range(min(calls, capacity))]
+    return meta, records
+
+
+def _signature_to_string(sig):
+    kind, parts = sig[0], sig[1:]
+    if kind == 'iterable':
+        return range_type.__name__
+    elif kind == 'type':
+        return parts[0].rsplit('.', 1)[-1]
+    elif kind == 'name':
+        return parts[0]
+    elif kind == 'list':
+        return '[%s]' % _signature_to_string(parts[0])
+    elif kind == 'tuple':
+        return '(%s)' % ', '.join(_signature_to_string(x) for x in parts)
+    elif kind == 'dict':
+        return '{%s:%s}' % tuple(_signature_to_string(x) for x in parts)
+    elif kind == 'set':
+        return '{%s}' % _signature_to_string(parts[0])
+    else:
+        return 'U(%s)' % ', '.join(_signature_to_string(x) for x in parts)
+
+
+_containers = {
+    'list': _type_name(list),
+    'tuple': _type_name(tuple),
+    'dict': _type_name(dict),
+    'set': _type_name(set),
+}
+
+
+def _matches(sig, t):
+    kind, parts = sig[0], sig[1:]
+    if kind == 'iterable':
+        return t['iterable']
+    elif kind == 'type':
+        return parts[0] in t['mro']
+    elif kind == 'name':
+        return any(name.rsplit('.', 1)[-1] == parts[0] for name in t['mro'])
+    elif kind == 'union':
+        return any(_matches(x, t) for x in parts)
+    else:
+        return _containers[kind] in t['mro']
+
+
+def replay(path):
+    """
+    Verify a recorded trace against the declared type signatures
+
+    Returns a dictionary mapping the names of the called functions to
+    dictionaries mapping their argument names (and `'return'`, for the
+    return value) to `(expected, observed)` tuples. `expected` is the
+    declared signature (None if not declared), and `observed` a list of
+    `(type name, calls, matches)` tuples, where `matches` tells whether the
+    type matches the declared signature (None if not declared).
+
+    """
+    meta, records = _read(path)
+    functions, types = meta['functions'], meta['types']
+
+    observed = {}
+    for record in records:
+        if not record[0]:
+            continue
+        fn = functions[record[0] - 1]
+        slots = list(zip(fn['args'], record[1:]))
+        slots.append(('return', record[-1]))
+        for name, type_id in slots:
+            if type_id:
+                key = (record[0], name, type_id)
+                observed[key] = observed.get(key, 0) + 1
+
+    report = {}
+    for (trace_id, name, type_id), n in sorted(observed.items()):
+        fn = functions[trace_id - 1]
+        if name == 'return':
+            sig = fn['returns']
+        else:
+            sig = fn['params'][fn['args'].index(name)]
+        t = types[type_id - 1]
+        if sig is None:
+            expected, matches = None, None
+        else:
+            expected, matches = _signature_to_string(sig), _matches(sig, t)
+        slots = report.setdefault(fn['name'], {})
+        slots.setdefault(name, (expected, []))[1].append(
+            (t['name'], n, matches))
+    return report
+
+
+def main(argv=None):
+    """Print the observed types and violations in a recorded trace"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        sys.stderr.write('usage: python -m typedecorator.trace TRACE_FILE\n')
+        return 2
+
+    violations = 0
+    for fn_name, slots in sorted(replay(argv[0]).items()):
+        print(fn_name)
+        for name, (expected, observed) in sorted(slots.items()):
+            print('    %s: %s' % (name, expected or 'undeclared'))
+            for type_name, n, matches in observed:
+                if matches is False:
+                    violations += 1
+                print('        %s%s (%d calls)' % (
+                    'VIOLATION ' if matches is False else '', type_name, n))
+
+    with open(argv[0] + '.json') as f:
+        dropped = json.load(f).get('dropped', 0)
+    if dropped:
+        print('%d calls not recorded (too many functions traced)' % dropped)
+
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())